@@ -0,0 +1,50 @@
+"""
+Transcription job queue.
+
+With REDIS_URL set, jobs are pushed onto a Redis list and consumed by the
+standalone worker (python -m app.background.worker), so transcriptions run
+outside the API process. Otherwise they go onto an in-process asyncio.Queue
+drained by a fixed number of consumer tasks started with the app.
+"""
+
+import asyncio
+import json
+import logging
+
+from app.background.processor import process_transcription
+from app.utils.job_store import get_redis
+
+TRANSCRIPTION_QUEUE_KEY = "transcription_jobs"
+
+logger = logging.getLogger(__name__)
+
+_local_queue = asyncio.Queue()
+_local_workers = []
+
+
+async def enqueue_transcription(job: dict):
+    """Queue a transcription job (process_transcription kwargs)."""
+    r = get_redis()
+    if r is None:
+        await _local_queue.put(job)
+        return
+    payload = dict(job, file_path=str(job['file_path']))
+    await r.lpush(TRANSCRIPTION_QUEUE_KEY, json.dumps(payload))
+
+
+async def _local_worker():
+    while True:
+        job = await _local_queue.get()
+        try:
+            await process_transcription(**job)
+        except Exception:
+            # Logged rather than raised so this consumer keeps running
+            logger.exception("Transcription job %s failed", job.get('job_id'))
+        finally:
+            _local_queue.task_done()
+
+
+def start_local_workers(concurrency: int):
+    """Spawn the in-process consumers; at most `concurrency` jobs run at once."""
+    for _ in range(concurrency):
+        _local_workers.append(asyncio.create_task(_local_worker()))
@@ -1,24 +1,45 @@
 from app.services.audio_extractor import extract_audio_from_video
 from app.services.transcription_service import transcribe_audio
 from app.utils.job_utils import update_job_status
+from app.utils import job_store
 from app.config import RESULTS_DIR, GCS_BUCKET_NAME, GOOGLE_PROJECT_ID
-from app.utils.file_utils import get_file_type
-import shutil
+from app.utils.file_utils import compress_file, unlink_if_exists
+import asyncio
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import Optional
+
+@lru_cache(maxsize=1)
+def _extract_pool():
+    """
+    Process pool FFmpeg extraction (and its Python wrapper) runs in, off the
+    event loop. Created on first use since every API and queue worker imports
+    this module; forkserver children don't inherit this process's event loop,
+    threads or gRPC channels.
+    """
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("forkserver"))
 
 async def process_transcription(
     job_id: str,
     file_path: Path,
     filename: str,
+    file_type: str,
     language_code: str,
     min_speakers: int,
     max_speakers: int,
-    keep_audio: bool
+    keep_audio: bool,
+    content_key: Optional[str] = None
 ):
-    """Background task to process transcription."""
+    """Background task to process transcription.
+
+    file_type is the 'video'/'audio' classification already made (and
+    validated) by the upload handler.
+    """
     try:
-        update_job_status(job_id, 'processing', 'Analyzing file...')
+        await update_job_status(job_id, 'processing', 'Analyzing file...')
         bucket_name = GCS_BUCKET_NAME or os.environ.get("GCS_BUCKET_NAME")
         project_id = GOOGLE_PROJECT_ID or os.environ.get("GOOGLE_PROJECT_ID")
 
@@ -26,51 +47,60 @@ async def process_transcription(
             raise ValueError("GCS_BUCKET_NAME and GOOGLE_PROJECT_ID must be set")
 
         audio_file_path = file_path
-        extracted_audio = False
-        file_type = get_file_type(filename)
+        # Video audio goes straight from FFmpeg to GCS unless it's to be kept
+        stream_audio = file_type == 'video' and not keep_audio
 
-        if file_type == 'video':
-            update_job_status(job_id, 'processing', 'Extracting audio from video (removing silence)...')
-            audio_file_path = Path(extract_audio_from_video(str(file_path), remove_silence=True))
-            extracted_audio = True
+        if file_type == 'video' and keep_audio:
+            await update_job_status(job_id, 'processing', 'Extracting audio from video (removing silence)...')
+            # Mono 16 kHz FLAC: all the recognizer uses, a fraction of the upload size
+            audio_file_path = await asyncio.get_running_loop().run_in_executor(
+                _extract_pool(), partial(extract_audio_from_video, str(file_path), remove_silence=True,
+                                       for_transcription=True)
+            )
         elif file_type == 'audio':
-            update_job_status(job_id, 'processing', 'Processing audio file...')
-        else:
-            raise ValueError(f"Unsupported file format: {Path(filename).suffix}")
+            await update_job_status(job_id, 'processing', 'Processing audio file...')
+        elif file_type != 'video':
+            raise ValueError(f"Unsupported file format: {os.path.splitext(filename)[1]}")
 
-        update_job_status(job_id, 'processing', 'Transcribing with speaker diarization...')
-        result = transcribe_audio(
+        if stream_audio:
+            await update_job_status(job_id, 'processing', 'Extracting audio (removing silence) and transcribing...')
+        else:
+            await update_job_status(job_id, 'processing', 'Transcribing with speaker diarization...')
+        # Blocking GCS/Speech calls run in a thread so other jobs keep progressing
+        result = await asyncio.to_thread(
+            transcribe_audio,
             str(audio_file_path),
             bucket_name,
             project_id,
             language_code=language_code,
             min_speaker_count=min_speakers,
             max_speaker_count=max_speakers,
-            save_to_file=True
+            save_to_file=True,
+            extract_from_video=stream_audio,
+            remove_silence=stream_audio
         )
 
         if 'output_file' in result:
-            result_filename = f"{job_id}_transcription.txt"
+            # Results are kept zstd-compressed and served as-is to clients that accept it
+            result_filename = f"{job_id}_transcription.txt.zst"
             result_path = RESULTS_DIR / result_filename
-            shutil.move(result['output_file'], result_path)
+            await asyncio.to_thread(compress_file, result['output_file'], result_path)
             result['output_file'] = str(result_path)
 
-        if extracted_audio and not keep_audio and audio_file_path.exists():
-            audio_file_path.unlink()
-
-        if file_path.exists():
-            file_path.unlink()
+        unlink_if_exists(file_path)
 
-        update_job_status(
+        await update_job_status(
             job_id,
             'completed',
             'Transcription completed successfully',
             transcription=result.get('transcription'),
             result_file=result.get('output_file')
         )
+        if content_key:
+            # Identical re-uploads with the same options now reuse this job
+            await job_store.set_job_content(content_key, job_id)
 
     except Exception as e:
         error_msg = str(e)
-        update_job_status(job_id, 'failed', f'Error: {error_msg}', error=error_msg)
-        if file_path.exists():
-            file_path.unlink()
+        await update_job_status(job_id, 'failed', f'Error: {error_msg}', error=error_msg)
+        unlink_if_exists(file_path)
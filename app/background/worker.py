@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Transcription worker: consumes jobs queued by the API from Redis and runs
+process_transcription with bounded concurrency.
+
+Run with: python -m app.background.worker
+Requires REDIS_URL and access to the same UPLOAD_DIR/RESULTS_DIR as the API.
+"""
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+from app.background.job_queue import TRANSCRIPTION_QUEUE_KEY
+from app.background.processor import process_transcription
+from app.config import REDIS_URL, WORKER_CONCURRENCY, WORKER_NAME
+from app.utils.job_store import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def processing_key(worker_name: str) -> str:
+    """Redis list holding the jobs a worker has taken but not finished."""
+    return f"{TRANSCRIPTION_QUEUE_KEY}:processing:{worker_name}"
+
+
+async def _run_job(payload: str, processing: str, sem: asyncio.Semaphore):
+    r = get_redis()
+    try:
+        try:
+            job = json.loads(payload)
+            job['file_path'] = Path(job['file_path'])
+            await process_transcription(**job)
+        except Exception:
+            # process_transcription records job failures itself; this is a
+            # bad payload or a bug, and retrying it wouldn't help
+            logger.exception("Transcription job failed: %s", payload)
+        # Not reached when the worker is cancelled, so the job is requeued
+        # on the next start
+        await r.lrem(processing, 1, payload)
+    finally:
+        sem.release()
+
+
+async def _requeue_unfinished(processing: str) -> int:
+    """Move jobs a previous run of this worker left unfinished back onto the queue."""
+    r = get_redis()
+    count = 0
+    # Oldest ends up next to be taken
+    while await r.lmove(processing, TRANSCRIPTION_QUEUE_KEY, "LEFT", "RIGHT") is not None:
+        count += 1
+    return count
+
+
+async def run_worker(concurrency: int = WORKER_CONCURRENCY, worker_name: str = WORKER_NAME):
+    """Pull jobs off the queue, running at most `concurrency` at a time."""
+    r = get_redis()
+    processing = processing_key(worker_name)
+    requeued = await _requeue_unfinished(processing)
+    sem = asyncio.Semaphore(concurrency)
+    tasks = set()
+    print(f"Worker {worker_name} started (concurrency={concurrency}, requeued {requeued} unfinished), "
+          "waiting for jobs...")
+    while True:
+        # Only take a job off the queue once there is capacity to run it.
+        # The job stays in this worker's processing list until it finishes,
+        # so a crash or restart doesn't lose it
+        await sem.acquire()
+        payload = await r.blmove(TRANSCRIPTION_QUEUE_KEY, processing, 0, "RIGHT", "LEFT")
+        task = asyncio.create_task(_run_job(payload, processing, sem))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+if __name__ == "__main__":
+    if not REDIS_URL:
+        raise SystemExit("REDIS_URL must be set to run the transcription worker")
+    asyncio.run(run_worker())
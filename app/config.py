@@ -3,6 +3,7 @@
 App configuration: load env and define shared directories/constants.
 """
 import os
+import socket
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -19,3 +20,19 @@ RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 # Google Cloud settings (read from env)
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
 GOOGLE_PROJECT_ID = os.getenv("GOOGLE_PROJECT_ID")
+
+# Redis for shared job state across workers (in-memory store when unset)
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Worker threads available to run_in_threadpool (blocking file saves, etc.)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "64"))
+
+# uvicorn worker processes; more than one needs REDIS_URL for shared job state
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "2" if REDIS_URL else "1"))
+
+# Max transcriptions a worker runs at once
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+
+# Names the worker's in-flight job list in Redis; keep it stable across
+# restarts so a restarted worker picks its unfinished jobs back up
+WORKER_NAME = os.getenv("WORKER_NAME") or socket.gethostname()
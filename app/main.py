@@ -3,20 +3,23 @@
 FastAPI entrypoint (modularized from original app.py)
 """
 
+import anyio.to_thread
 import uvicorn
 from fastapi import FastAPI
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 
-from app.config import UPLOAD_DIR, RESULTS_DIR
+from app.config import UPLOAD_DIR, RESULTS_DIR, THREADPOOL_SIZE, REDIS_URL, WORKER_CONCURRENCY, WEB_CONCURRENCY
+from app.background.job_queue import start_local_workers
 from app.routers import health, transcribe, jobs
 
 app = FastAPI(
     title="Meeting Performance Analyzer",
     description="Transcribe audio from video/audio files with speaker diarization",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS (same permissive configuration as before)
@@ -28,6 +31,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # Default limiter is 40 threads; raise it so parallel uploads aren't capped
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def start_transcription_workers():
+    # With Redis, jobs are consumed by the standalone worker instead
+    if not REDIS_URL:
+        start_local_workers(WORKER_CONCURRENCY)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(transcribe.router)
@@ -46,4 +60,15 @@ async def root():
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    if WEB_CONCURRENCY > 1 and not REDIS_URL:
+        # Each worker would have its own in-memory jobs, so requests for a
+        # job would 404 whenever another worker handles them
+        raise SystemExit("WEB_CONCURRENCY > 1 requires REDIS_URL for shared job state")
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=WEB_CONCURRENCY
+    )
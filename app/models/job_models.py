@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import Optional, TypedDict
 from pydantic import BaseModel
 
 class TranscriptionRequest(BaseModel):
@@ -13,13 +14,36 @@ class JobStatus(BaseModel):
     status: str
     progress: str
     filename: str
-    created_at: str
-    completed_at: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
     error: Optional[str] = None
     result_file: Optional[str] = None
     transcription: Optional[str] = None
 
 
+class JobRecord(TypedDict):
+    """Shape of a stored job; a superset of the JobStatus fields.
+
+    Timestamps are time.time_ns() integers, formatted as ISO strings only
+    when a job is returned by the API.
+    """
+    job_id: str
+    status: str
+    progress: str
+    filename: str
+    file_type: str
+    created_at: int
+    completed_at: Optional[int]
+    error: Optional[str]
+    result_file: Optional[str]
+    transcription: Optional[str]
+    content_key: str
+
+
+# Fields returned by the status endpoint, in JobStatus order
+JOB_STATUS_FIELDS = tuple(JobStatus.model_fields)
+
+
 class JobResponse(BaseModel):
     job_id: str
     message: str
@@ -1,74 +1,141 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import List
-from pathlib import Path
+from urllib.parse import quote
+import logging
+import os
 
-from app.utils.job_utils import jobs_db
-from app.models.job_models import JobStatus
+import orjson
+
+from app.utils import job_store
+from app.utils.job_utils import job_for_response, format_timestamp
+from app.utils.file_utils import iter_decompressed, unlink_if_exists
+from app.utils.responses import LargeChunkFileResponse, accepts_encoding
+from app.models.job_models import JobStatus, JOB_STATUS_FIELDS
 
 router = APIRouter(prefix="/api")
+logger = logging.getLogger(__name__)
+
+# Seconds without an update before the events stream sends a keepalive
+# comment (so proxies don't drop the idle connection) and checks the job
+# still exists
+EVENTS_KEEPALIVE_INTERVAL = 15
 
-@router.get("/jobs/{job_id}", response_model=JobStatus)
+@router.get("/jobs/{job_id}", response_model=None, responses={200: {"model": JobStatus}})
 async def get_job_status(job_id: str):
     """Get the status of a transcription job"""
-    if job_id not in jobs_db:
+    job = await job_store.get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return JobStatus(**jobs_db[job_id])
+    # Records are built as JobRecord by the server, so skip re-validation
+    return ORJSONResponse(job_for_response(job, JOB_STATUS_FIELDS))
 
 
 @router.get("/jobs")
 async def list_jobs(limit: int = 10):
     """List all transcription jobs"""
-    jobs = list(jobs_db.values())
-    # Sort by created_at descending
-    jobs.sort(key=lambda x: x['created_at'], reverse=True)
-    return {"jobs": jobs[:limit], "total": len(jobs)}
+    jobs, total = await job_store.list_jobs(limit)
+    return {"jobs": [job_for_response(job) for job in jobs], "total": total}
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream job status changes as Server-Sent Events until the job finishes or is deleted"""
+    if await job_store.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async with job_store.subscribe(job_id, idle_timeout=EVENTS_KEEPALIVE_INTERVAL) as updates:
+            # Snapshot after subscribing so no update falls in between
+            job = await job_store.get_job(job_id)
+            if job is None:
+                return
+            yield b"data: " + orjson.dumps(job_for_response(job, JOB_STATUS_FIELDS)) + b"\n\n"
+            status = job['status']
+            while status not in ('completed', 'failed'):
+                fields = await anext(updates)
+                if fields is None:
+                    if await job_store.get_job(job_id) is None:
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if 'completed_at' in fields:
+                    fields = dict(fields, completed_at=format_timestamp(fields['completed_at']))
+                yield b"data: " + orjson.dumps(fields) + b"\n\n"
+                status = fields.get('status', status)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 
 @router.get("/jobs/{job_id}/download")
-async def download_transcription(job_id: str):
+async def download_transcription(job_id: str, request: Request):
     """Download the transcription result file"""
-    if job_id not in jobs_db:
+    job = await job_store.get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs_db[job_id]
-
     if job['status'] != 'completed':
         raise HTTPException(status_code=400, detail="Transcription not completed yet")
 
     if not job.get('result_file'):
         raise HTTPException(status_code=404, detail="Result file not found")
 
-    result_path = Path(job['result_file'])
-    if not result_path.exists():
+    result_path = job['result_file']
+    try:
+        stat_result = os.stat(result_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Result file not found on disk")
 
-    return FileResponse(
-        path=result_path,
-        filename=f"{job['filename']}_transcription.txt",
-        media_type="text/plain"
+    download_name = f"{job['filename']}_transcription.txt"
+    if not result_path.endswith('.zst'):
+        return LargeChunkFileResponse(
+            path=result_path,
+            filename=download_name,
+            media_type="text/plain",
+            stat_result=stat_result
+        )
+
+    if accepts_encoding(request.headers.get('accept-encoding', ''), 'zstd'):
+        # Send the stored compressed bytes; the client decodes them
+        return LargeChunkFileResponse(
+            path=result_path,
+            filename=download_name,
+            media_type="text/plain",
+            stat_result=stat_result,
+            headers={"Content-Encoding": "zstd", "Vary": "Accept-Encoding"}
+        )
+
+    return StreamingResponse(
+        iter_decompressed(result_path),
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(download_name)}",
+            "Vary": "Accept-Encoding"
+        }
     )
 
 
 @router.delete("/jobs/{job_id}")
 async def delete_job(job_id: str):
     """Delete a transcription job and its results"""
-    if job_id not in jobs_db:
+    job = await job_store.get_job(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs_db[job_id]
-
     # Delete result file if exists
     if job.get('result_file'):
-        result_path = Path(job['result_file'])
-        if result_path.exists():
-            try:
-                result_path.unlink()
-            except Exception:
-                pass
+        try:
+            unlink_if_exists(job['result_file'])
+        except OSError as e:
+            # The record is still deleted; the file is left for an operator
+            logger.warning("Could not delete result file %s: %s", job['result_file'], e)
 
     # Remove from database
-    del jobs_db[job_id]
+    await job_store.delete_job(job_id)
 
     return {"message": "Job deleted successfully"}
@@ -1,20 +1,85 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Form
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from pathlib import Path
+import os
+import time
 import uuid
-from datetime import datetime
 
-from app.models.job_models import JobResponse
-from app.utils.file_utils import get_file_type, save_upload_file
-from app.utils.job_utils import jobs_db
-from app.background.processor import process_transcription
+import aiofiles
+
+from app.models.job_models import JobRecord, JobResponse
+from app.utils.file_utils import (
+    classify_file, sniff_file_type, MAGIC_BYTES_SIZE, save_upload_file, content_hasher, preallocate_file,
+    unlink_if_exists
+)
+from app.utils import job_store
+from app.background.job_queue import enqueue_transcription
 from app.config import UPLOAD_DIR
 
 router = APIRouter()
 
+
+async def _queue_job(
+    job_id: str,
+    upload_path: Path,
+    filename: str,
+    file_type: str,
+    language_code: str,
+    min_speakers: int,
+    max_speakers: int,
+    keep_audio: bool,
+    content_hash: str
+) -> JobResponse:
+    """Create the job record for a saved upload and schedule its processing"""
+    # Same bytes with the same options (keep_audio included, since reusing a
+    # job that discarded the audio can't honour it): reuse the finished job
+    content_key = f"{content_hash}:{language_code}:{min_speakers}:{max_speakers}:{int(keep_audio)}"
+    existing = await job_store.get_job_by_content(content_key)
+    if existing is not None and existing['status'] == 'completed':
+        os.unlink(upload_path)
+        return JobResponse(
+            job_id=existing['job_id'],
+            message="Identical file already transcribed",
+            status="completed"
+        )
+
+    await job_store.set_job(job_id, JobRecord(
+        job_id=job_id,
+        status='queued',
+        progress='File uploaded, queued for processing',
+        filename=filename,
+        file_type=file_type,
+        created_at=time.time_ns(),
+        completed_at=None,
+        error=None,
+        result_file=None,
+        transcription=None,
+        content_key=content_key
+    ))
+
+    job = {
+        'job_id': job_id,
+        'file_path': upload_path,
+        'filename': filename,
+        'file_type': file_type,
+        'language_code': language_code,
+        'min_speakers': min_speakers,
+        'max_speakers': max_speakers,
+        'keep_audio': keep_audio,
+        'content_key': content_key
+    }
+    await enqueue_transcription(job)
+
+    return JobResponse(
+        job_id=job_id,
+        message="Transcription job created successfully",
+        status="queued"
+    )
+
+
 @router.post("/api/transcribe", response_model=JobResponse)
 async def create_transcription_job(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     language_code: str = Form("en-US"),
     min_speakers: int = Form(2),
@@ -24,61 +89,110 @@ async def create_transcription_job(
     """
     Upload a video or audio file for transcription
     """
-    # Validate file type
-    file_type = get_file_type(file.filename)
+    # Validate file type (by content when the extension isn't recognised)
+    file_extension, file_type = classify_file(file.filename)
+    if file_type == 'unknown':
+        file_type = sniff_file_type(await file.read(MAGIC_BYTES_SIZE))
+        await file.seek(0)
     if file_type == 'unknown':
         raise HTTPException(
             status_code=400,
-            detail=f"Unsupported file format: {Path(file.filename).suffix}"
+            detail=f"Unsupported file format: {file_extension}"
         )
 
     # Generate job ID
     job_id = str(uuid.uuid4())
 
     # Save uploaded file
-    file_extension = Path(file.filename).suffix
     upload_path = UPLOAD_DIR / f"{job_id}{file_extension}"
 
     try:
-        # Save file contents
-        with open(upload_path, "wb") as buffer:
-            from shutil import copyfileobj
-            copyfileobj(file.file, buffer)
-        try:
-            file.file.close()
-        except Exception:
-            pass
+        # Blocking copy runs on the threadpool so concurrent uploads don't queue.
+        # Hashed in the same pass for duplicate detection
+        hasher = content_hasher()
+        await run_in_threadpool(save_upload_file, file, upload_path, hasher)
+        content_hash = hasher.hexdigest()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
-    # Create job record
-    jobs_db[job_id] = {
-        'job_id': job_id,
-        'status': 'queued',
-        'progress': 'File uploaded, queued for processing',
-        'filename': file.filename,
-        'file_type': file_type,
-        'created_at': datetime.now().isoformat(),
-        'completed_at': None,
-        'error': None,
-        'result_file': None,
-        'transcription': None
-    }
-
-    # Add background task
-    background_tasks.add_task(
-        process_transcription,
+    return await _queue_job(
         job_id,
         upload_path,
         file.filename,
+        file_type,
         language_code,
         min_speakers,
         max_speakers,
-        keep_audio
+        keep_audio,
+        content_hash
     )
 
-    return JobResponse(
-        job_id=job_id,
-        message="Transcription job created successfully",
-        status="queued"
+
+@router.put("/api/transcribe/{filename}", response_model=JobResponse)
+async def stream_transcription_job(
+    filename: str,
+    request: Request,
+    language_code: str = "en-US",
+    min_speakers: int = 2,
+    max_speakers: int = 5,
+    keep_audio: bool = False
+):
+    """
+    Upload a video or audio file as the raw request body for transcription.
+
+    The body is written to disk chunk by chunk as it is received, so memory
+    use stays constant and no multipart spooling happens before the handler.
+    """
+    try:
+        content_length = int(request.headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+
+    # Validate file type (by content when the extension isn't recognised)
+    file_extension, file_type = classify_file(filename)
+    body = request.stream()
+    head = b""
+    if file_type == 'unknown':
+        head = await anext(body, b"")
+        file_type = sniff_file_type(head[:MAGIC_BYTES_SIZE])
+    if file_type == 'unknown':
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format: {file_extension}"
+        )
+
+    # Generate job ID
+    job_id = str(uuid.uuid4())
+
+    # Stream request body to disk
+    upload_path = UPLOAD_DIR / f"{job_id}{file_extension}"
+
+    hasher = content_hasher()
+    try:
+        async with aiofiles.open(upload_path, "wb") as buffer:
+            await run_in_threadpool(preallocate_file, buffer.fileno(), content_length)
+            if head:
+                # Already read while sniffing the file type
+                hasher.update(head)
+                await buffer.write(head)
+            async for chunk in body:
+                hasher.update(chunk)
+                await buffer.write(chunk)
+            if content_length:
+                # Drop any preallocated tail the body didn't fill
+                await buffer.truncate()
+    except Exception as e:
+        unlink_if_exists(upload_path)
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+
+    return await _queue_job(
+        job_id,
+        upload_path,
+        filename,
+        file_type,
+        language_code,
+        min_speakers,
+        max_speakers,
+        keep_audio,
+        hasher.hexdigest()
     )
@@ -2,16 +2,84 @@
 """
 Audio Extractor Service
 Extracts audio from video files using FFmpeg and optionally removes silent parts
+(with FFmpeg's silenceremove filter, in the same pass as the encode)
 """
 
 import os
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
+from shutil import which
 
+# Resolved once at import; None when FFmpeg isn't on PATH
+_FFMPEG_PATH = which("ffmpeg")
 
-def extract_audio_from_video(video_path, output_audio_path=None, audio_format="mp3", remove_silence=False):
+# Silence is anything quieter than this. A fixed level rather than one
+# relative to the track's loudness, which would take a separate decode pass
+# to measure before the extraction could start; low enough that speech in
+# quiet recordings (mean volume down to about -45 dBFS) isn't cut
+SILENCE_THRESH_DB = -50.0
+# silenceremove close to the old split_on_silence settings: trim leading
+# silence, then cut later silences of 0.7s or more, keeping 0.1s at each cut
+_SILENCE_FILTER = (
+    f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESH_DB:.1f}dB:start_silence=0.1:"
+    f"stop_periods=-1:stop_duration=0.7:stop_threshold={SILENCE_THRESH_DB:.1f}dB:stop_silence=0.1"
+)
+
+# Lines of FFmpeg stderr kept for error messages
+STDERR_TAIL_LINES = 200
+
+# Source audio codecs each output format can hold as-is (stream copy)
+_COPYABLE_CODECS = {
+    'mp3': {'mp3'},
+    'wav': {'pcm_s16le'},
+    'flac': {'flac'},
+    'aac': {'aac'},
+    'm4a': {'aac'},
+    'ogg': {'vorbis', 'opus'},
+    'opus': {'opus'}
+}
+
+# Rate control per encoder: VBR where the encoder does it well (speech
+# doesn't need 192k CBR), nothing for lossless codecs
+_QUALITY_ARGS = {
+    'libmp3lame': ['-q:a', '4'],
+    'libvorbis': ['-q:a', '4'],
+    'libopus': ['-b:a', '64k', '-vbr', 'on'],
+    'aac': ['-b:a', '192k']
+}
+
+
+def _source_audio_codec(video_path):
+    """Codec name of the first audio stream, or None if it can't be probed."""
+    try:
+        info = get_video_info(video_path)
+    except (OSError, RuntimeError):
+        return None
+    for stream in info.get('streams', []):
+        if stream.get('codec_type') == 'audio':
+            return stream.get('codec_name')
+    return None
+
+
+def _run_ffmpeg(command):
+    """
+    Run FFmpeg, discarding stdout and keeping only the last STDERR_TAIL_LINES
+    lines of stderr (drained as it's written, so the pipe never fills up).
+    Raises RuntimeError with that tail on failure.
+    """
+    with subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE) as proc:
+        tail = deque(proc.stderr, maxlen=STDERR_TAIL_LINES)
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed:\n{b''.join(tail).decode('utf-8', 'replace')}")
+
+
+def extract_audio_from_video(video_path, output_audio_path=None, audio_format="mp3", remove_silence=False,
+                             for_transcription=False):
     """
     Extract audio from a video file using FFmpeg and optionally remove silent parts.
     
@@ -20,6 +88,8 @@ def extract_audio_from_video(video_path, output_audio_path=None, audio_format="m
         output_audio_path (str, optional): Path for the output audio file.
         audio_format (str): Output audio format (mp3, wav, flac, etc.). Default: mp3
         remove_silence (bool): Whether to remove silent parts. Default: False
+        for_transcription (bool): Write mono 16 kHz FLAC (what speech recognition
+            uses) instead of stereo 44.1 kHz audio_format. Default: False
     
     Returns:
         str: Path to the extracted audio file
@@ -30,57 +100,125 @@ def extract_audio_from_video(video_path, output_audio_path=None, audio_format="m
         raise FileNotFoundError(f"Video file not found: {video_path}")
     
     # Check FFmpeg installation
-    try:
-        subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-    except FileNotFoundError:
+    if _FFMPEG_PATH is None:
         raise RuntimeError("FFmpeg is not installed. Please install it.")
     
+    if for_transcription:
+        audio_format = 'flac'
+
     # Generate output path if not provided
     if output_audio_path is None:
         video_path_obj = Path(video_path)
         output_audio_path = str(video_path_obj.with_suffix(f'.{audio_format}'))
+
+    command = [
+        _FFMPEG_PATH,
+        '-nostats',
+        '-i', video_path,
+        '-vn',
+        *_audio_args(video_path, audio_format, remove_silence, for_transcription),
+        '-y',
+        output_audio_path
+    ]
     
-    # Extract audio using FFmpeg
+    _run_ffmpeg(command)
+
+    return output_audio_path
+
+
+@contextmanager
+def stream_audio_from_video(video_path, remove_silence=False):
+    """
+    Extract audio for transcription (mono 16 kHz FLAC) without writing it to
+    disk: yields FFmpeg's stdout pipe to read the encoded audio from while
+    it's being produced. Raises RuntimeError on exit if FFmpeg failed.
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+
+    if _FFMPEG_PATH is None:
+        raise RuntimeError("FFmpeg is not installed. Please install it.")
+
+    command = [
+        _FFMPEG_PATH,
+        '-nostats',
+        '-i', video_path,
+        '-vn',
+        *_audio_args(video_path, 'flac', remove_silence, True),
+        '-f', 'flac',
+        'pipe:1'
+    ]
+    tail = deque(maxlen=STDERR_TAIL_LINES)
+    with subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE) as proc:
+        # Drain stderr alongside the reader so neither pipe fills up
+        drain = threading.Thread(target=tail.extend, args=(proc.stderr,), daemon=True)
+        drain.start()
+        try:
+            yield proc.stdout
+        except BaseException:
+            proc.kill()
+            raise
+    drain.join()
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed:\n{b''.join(tail).decode('utf-8', 'replace')}")
+
+
+def _audio_args(video_path, audio_format, remove_silence, for_transcription):
+    """FFmpeg output options for the audio stream."""
     codec_map = {
         'mp3': 'libmp3lame',
         'wav': 'pcm_s16le',
         'flac': 'flac',
         'aac': 'aac',
         'm4a': 'aac',
-        'ogg': 'libvorbis'
+        'ogg': 'libvorbis',
+        'opus': 'libopus'
     }
     codec = codec_map.get(audio_format.lower(), 'libmp3lame')
-    
-    command = [
-        'ffmpeg',
-        '-i', video_path,
-        '-vn',
-        '-acodec', codec,
-        '-ab', '192k',
-        '-ar', '44100',
-        '-ac', '2',
-        '-y',
-        output_audio_path
-    ]
-    
-    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-    
-    # Remove silence if requested
+
+    if for_transcription:
+        encode_args = ['-acodec', 'flac', '-ar', '16000', '-ac', '1']
+    else:
+        # Opus doesn't support 44.1 kHz
+        sample_rate = '48000' if codec == 'libopus' else '44100'
+        encode_args = ['-acodec', codec, *_QUALITY_ARGS.get(codec, ()), '-ar', sample_rate, '-ac', '2']
+
     if remove_silence:
-        audio = AudioSegment.from_file(output_audio_path)
-        chunks = split_on_silence(
-            audio,
-            min_silence_len=700,
-            silence_thresh=audio.dBFS-16,
-            keep_silence=100
-        )
-        if chunks:
-            processed_audio = AudioSegment.empty()
-            for chunk in chunks:
-                processed_audio += chunk
-            processed_audio.export(output_audio_path, format=audio_format)
-    
-    return output_audio_path
+        # Silence is cut by FFmpeg's filter graph in the same pass as the encode
+        audio_args = ['-af', _SILENCE_FILTER, *encode_args]
+    elif not for_transcription and \
+            _source_audio_codec(video_path) in _COPYABLE_CODECS.get(audio_format.lower(), ()):
+        # Remux without re-encoding when the source already has the target codec
+        audio_args = ['-c:a', 'copy']
+    else:
+        audio_args = encode_args
+    return audio_args
+
+
+def extract_audio_batch(video_paths, audio_format="mp3", remove_silence=False, max_workers=None):
+    """
+    Extract audio from several videos in parallel, one FFmpeg job per process.
+
+    Silence removal runs inside the worker processes as well. At most
+    max_workers (default: CPU count) extractions are in flight at a time.
+
+    Returns:
+        dict: video path -> extracted audio path
+    """
+    max_workers = max_workers or os.cpu_count()
+    slots = threading.BoundedSemaphore(max_workers)
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for video_path in video_paths:
+            slots.acquire()
+            future = pool.submit(extract_audio_from_video, video_path, None, audio_format, remove_silence)
+            future.add_done_callback(lambda _: slots.release())
+            futures[future] = video_path
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
 
 
 def get_video_info(video_path):
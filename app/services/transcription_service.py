@@ -5,16 +5,54 @@ Handles audio transcription with speaker diarization using Google Cloud Speech-t
 """
 
 import os
-import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import groupby
+import ijson
+import orjson
 from google.api_core.client_options import ClientOptions
 from google.cloud.speech_v2 import SpeechClient
 from google.cloud.speech_v2.types import cloud_speech
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 from google.auth import default
 
+from app.services.audio_extractor import stream_audio_from_video
+
 MAX_AUDIO_LENGTH_SECS = 8 * 60 * 60  # 8 hours
 
+# Files larger than one chunk are uploaded as parallel XML multipart parts
+UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+UPLOAD_MAX_WORKERS = 8
+# Buffer per request when streaming audio of unknown size (multiple of 256 KiB)
+STREAM_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Result shards downloaded at once
+DOWNLOAD_MAX_WORKERS = 16
+# Shards up to this size are parsed whole with orjson, larger ones streamed with ijson
+IN_MEMORY_PARSE_MAX_SIZE = 16 * 1024 * 1024
+# Seconds between checks for new result shards while recognition runs
+SHARD_POLL_INTERVAL = 10
+
+
+@lru_cache(maxsize=1)
+def _storage_client():
+    """Process-wide Storage client (Application Default Credentials)."""
+    credentials, project = default()
+    return storage.Client(credentials=credentials, project=project)
+
+
+@lru_cache(maxsize=1)
+def _speech_client():
+    """Process-wide Speech-to-Text client on the us endpoint."""
+    credentials, _ = default()
+    return SpeechClient(
+        credentials=credentials,
+        client_options=ClientOptions(
+            api_endpoint="us-speech.googleapis.com",
+        ),
+    )
+
 
 def upload_to_gcs(local_file_path, bucket_name, blob_name):
     """
@@ -31,22 +69,68 @@ def upload_to_gcs(local_file_path, bucket_name, blob_name):
     """
     print(f"Uploading {local_file_path} to gs://{bucket_name}/{blob_name}...")
     
-    # Get default credentials
-    credentials, project = default()
-    
-    # Initialize storage client with credentials
-    storage_client = storage.Client(credentials=credentials, project=project)
-    
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _storage_client().bucket(bucket_name)
     blob = bucket.blob(blob_name)
     
-    blob.upload_from_filename(local_file_path)
+    if os.path.getsize(local_file_path) > UPLOAD_CHUNK_SIZE:
+        # Threads rather than processes: this already runs in a worker thread
+        transfer_manager.upload_chunks_concurrently(
+            local_file_path,
+            blob,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            worker_type=transfer_manager.THREAD,
+            max_workers=UPLOAD_MAX_WORKERS
+        )
+    else:
+        blob.upload_from_filename(local_file_path)
     
     gcs_uri = f"gs://{bucket_name}/{blob_name}"
     print(f"File uploaded successfully to {gcs_uri}")
     return gcs_uri
 
 
+class _PipeReader:
+    """
+    Pipe wrapper for resumable uploads, which call tell() before every chunk:
+    the position is counted here since a pipe can't report it.
+    """
+
+    def __init__(self, pipe):
+        self._pipe = pipe
+        self._pos = 0
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        data = self._pipe.read(size)
+        self._pos += len(data)
+        return data
+
+
+def extract_and_upload(video_path, bucket_name, blob_name, remove_silence=False):
+    """
+    Extract a video's audio (mono 16 kHz FLAC) straight into Google Cloud
+    Storage: FFmpeg's output is sent as a resumable upload while it's being
+    encoded, so extraction and upload overlap and nothing is written locally.
+
+    Returns:
+        str: GCS URI of the uploaded audio
+    """
+    print(f"Extracting audio from {video_path} to gs://{bucket_name}/{blob_name}...")
+
+    blob = _storage_client().bucket(bucket_name).blob(blob_name)
+    blob.chunk_size = STREAM_UPLOAD_CHUNK_SIZE
+
+    with stream_audio_from_video(video_path, remove_silence=remove_silence) as audio:
+        # Size unknown until FFmpeg exits: the short last chunk ends the upload
+        blob.upload_from_file(_PipeReader(audio), content_type="audio/flac", rewind=False)
+
+    gcs_uri = f"gs://{bucket_name}/{blob_name}"
+    print(f"Audio uploaded successfully to {gcs_uri}")
+    return gcs_uri
+
+
 def _perform_transcription(audio_gcs_uri, gcs_output_folder, project_id, 
                           language_code="en-US", 
                           min_speaker_count=2, max_speaker_count=5):
@@ -62,19 +146,10 @@ def _perform_transcription(audio_gcs_uri, gcs_output_folder, project_id,
         max_speaker_count (int): Maximum number of speakers (default: 5)
     
     Returns:
-        dict: Transcription response from API
+        Operation: The running batch recognition (results land in gcs_output_folder)
     """
     
-    # Get default credentials
-    credentials, _ = default()
-    
-    # Initialize the Speech client
-    client = SpeechClient(
-        credentials=credentials,
-        client_options=ClientOptions(
-            api_endpoint="us-speech.googleapis.com",
-        ),
-    )
+    client = _speech_client()
     
     print(f"Processing audio file: {audio_gcs_uri}")
     print("Using Chirp 3 model for improved accuracy...")
@@ -111,113 +186,124 @@ def _perform_transcription(audio_gcs_uri, gcs_output_folder, project_id,
     print("Sending batch recognition request to Google Speech-to-Text V2 API...")
     print("This may take a while depending on the audio file size...")
     
-    # Perform the transcription
-    operation = client.batch_recognize(request=request)
-    
-    print("Waiting for operation to complete...")
-    response = operation.result(timeout=3 * MAX_AUDIO_LENGTH_SECS)
-    
-    return response
+    # Start the transcription; the caller collects results while it runs
+    return client.batch_recognize(request=request)
+
+
+def _speaker_label(word_info):
+    return word_info.get('speakerLabel', word_info.get('speakerTag', 'Unknown'))
+
+
+def _segments_from_results(results):
+    """Speaker segments from an iterable of recognition results."""
+    segments = []
+    for res in results:
+        if 'alternatives' in res and len(res['alternatives']) > 0:
+            alternative = res['alternatives'][0]
+            
+            if 'words' in alternative:
+                # One segment per run of consecutive words by the same speaker
+                for speaker, words in groupby(alternative['words'], key=_speaker_label):
+                    segments.append({
+                        'speaker': speaker,
+                        'text': ' '.join([word_info.get('word', '') for word_info in words])
+                    })
+    return segments
+
+
+def _shard_segments(blob):
+    """Speaker segments of one result shard."""
+    print(f"Processing {blob.name}...")
+    if blob.size is not None and blob.size <= IN_MEMORY_PARSE_MAX_SIZE:
+        # Small shards: one download and orjson's much faster full parse
+        return _segments_from_results(orjson.loads(blob.download_as_bytes()).get('results', ()))
+    with blob.open('rb') as f:
+        # Large shards: one result at a time instead of the whole document in memory
+        return _segments_from_results(ijson.items(f, 'results.item'))
 
 
-def _download_and_format_transcription(gcs_output_folder, bucket_name):
+def _download_and_format_transcription(gcs_output_folder, bucket_name, operation=None):
     """
     Download and format the transcription results from GCS.
     
     Args:
         gcs_output_folder (str): GCS folder containing transcription results
         bucket_name (str): GCS bucket name
+        operation (Operation, optional): Batch recognition still writing to
+            gcs_output_folder; shards are fetched as they appear until it's done
     
     Returns:
         str: Formatted transcription text
     """
     print(f"Downloading transcription results from {gcs_output_folder}...")
     
-    # Get default credentials
-    credentials, project = default()
-    
-    # Initialize storage client
-    storage_client = storage.Client(credentials=credentials, project=project)
-    
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _storage_client().bucket(bucket_name)
     
     # List all JSON files in the output folder
     prefix = gcs_output_folder.replace(f"gs://{bucket_name}/", "")
-    blobs = bucket.list_blobs(prefix=prefix)
-    
-    transcription_segments = []
-    
-    for blob in blobs:
-        if blob.name.endswith('.json'):
-            print(f"Processing {blob.name}...")
-            content = blob.download_as_text()
-            result = json.loads(content)
-            
-            # Extract transcription with speaker labels
-            if 'results' in result:
-                for res in result['results']:
-                    if 'alternatives' in res and len(res['alternatives']) > 0:
-                        alternative = res['alternatives'][0]
-                        
-                        if 'words' in alternative:
-                            current_speaker = None
-                            current_text = []
-                            
-                            for word_info in alternative['words']:
-                                speaker_label = word_info.get('speakerLabel', word_info.get('speakerTag', 'Unknown'))
-                                word = word_info.get('word', '')
-                                
-                                if speaker_label != current_speaker:
-                                    # Save previous segment
-                                    if current_speaker is not None:
-                                        transcription_segments.append({
-                                            'speaker': current_speaker,
-                                            'text': ' '.join(current_text)
-                                        })
-                                    
-                                    # Start new segment
-                                    current_speaker = speaker_label
-                                    current_text = [word]
-                                else:
-                                    current_text.append(word)
-                            
-                            # Add the last segment
-                            if current_speaker is not None:
-                                transcription_segments.append({
-                                    'speaker': current_speaker,
-                                    'text': ' '.join(current_text)
-                                })
-    
+    shards = {}
+    deadline = time.monotonic() + 3 * MAX_AUDIO_LENGTH_SECS
+
+    # Fetch and parse shards concurrently, starting on each one as soon as
+    # it's written rather than after the whole recognition finishes
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_WORKERS) as pool:
+        while True:
+            # Checked before listing so the last pass sees every shard
+            done = operation is None or operation.done()
+            for blob in bucket.list_blobs(prefix=prefix):
+                if blob.name.endswith('.json') and blob.name not in shards:
+                    shards[blob.name] = pool.submit(_shard_segments, blob)
+            if done:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batch recognition did not finish within {3 * MAX_AUDIO_LENGTH_SECS}s")
+            time.sleep(SHARD_POLL_INTERVAL)
+
+        if operation is not None:
+            # Raises if the recognition failed
+            operation.result()
+
+        # Same order as the bucket listing (by name)
+        transcription_segments = [
+            segment for name in sorted(shards) for segment in shards[name].result()
+        ]
+
     # Format output
     if not transcription_segments:
         return "No transcription results found."
     
-    output = "=" * 80 + "\n"
-    output += "TRANSCRIPTION WITH SPEAKER DIARIZATION (Chirp 3 Model)\n"
-    output += "=" * 80 + "\n\n"
+    # Collected and joined once; += would copy the whole output each time
+    parts = [
+        "=" * 80 + "\n",
+        "TRANSCRIPTION WITH SPEAKER DIARIZATION (Chirp 3 Model)\n",
+        "=" * 80 + "\n\n"
+    ]
     
     for segment in transcription_segments:
-        output += f"Speaker {segment['speaker']}:\n"
-        output += f"{segment['text']}\n\n"
+        parts.append(f"Speaker {segment['speaker']}:\n{segment['text']}\n\n")
     
-    return output
+    return "".join(parts)
 
 
 def transcribe_audio(audio_file_path, bucket_name, project_id, 
                      language_code="en-US", 
                      min_speaker_count=2, max_speaker_count=5,
-                     save_to_file=True):
+                     save_to_file=True, extract_from_video=False, remove_silence=False):
     """
     Main function to transcribe audio with speaker diarization.
     
     Args:
-        audio_file_path (str): Path to the local audio file
+        audio_file_path (str): Path to the local audio file (or video file
+            with extract_from_video)
         bucket_name (str): Google Cloud Storage bucket name
         project_id (str): Google Cloud project ID
         language_code (str): Language code (default: "en-US")
         min_speaker_count (int): Minimum number of speakers (default: 2)
         max_speaker_count (int): Maximum number of speakers (default: 5)
         save_to_file (bool): Whether to save transcription to a file (default: True)
+        extract_from_video (bool): audio_file_path is a video; stream its audio
+            to GCS with extract_and_upload (default: False)
+        remove_silence (bool): Cut silent parts while extracting (default: False)
     
     Returns:
         dict: Dictionary containing:
@@ -249,12 +335,17 @@ def transcribe_audio(audio_file_path, bucket_name, project_id,
     output_folder_name = f"transcripts/{timestamp}_{audio_filename.rsplit('.', 1)[0]}"
     
     # Upload audio file to GCS
-    audio_gcs_uri = upload_to_gcs(audio_file_path, bucket_name, audio_blob_name)
+    if extract_from_video:
+        audio_blob_name = audio_blob_name.rsplit('.', 1)[0] + '.flac'
+        audio_gcs_uri = extract_and_upload(audio_file_path, bucket_name, audio_blob_name,
+                                           remove_silence=remove_silence)
+    else:
+        audio_gcs_uri = upload_to_gcs(audio_file_path, bucket_name, audio_blob_name)
     gcs_output_folder = f"gs://{bucket_name}/{output_folder_name}"
     
     # Transcribe the audio
     print("\n" + "=" * 80)
-    response = _perform_transcription(
+    operation = _perform_transcription(
         audio_gcs_uri, 
         gcs_output_folder, 
         project_id,
@@ -263,15 +354,18 @@ def transcribe_audio(audio_file_path, bucket_name, project_id,
         max_speaker_count=max_speaker_count
     )
     
-    print(f"\nBatch recognition completed!")
-    print(f"Results saved to: {gcs_output_folder}")
+    print("Waiting for operation to complete (collecting results as they land)...")
     
     # Download and format the transcription
     formatted_transcription = _download_and_format_transcription(
         gcs_output_folder, 
-        bucket_name
+        bucket_name,
+        operation
     )
     
+    print(f"\nBatch recognition completed!")
+    print(f"Results saved to: {gcs_output_folder}")
+    
     print("\n" + formatted_transcription)
     
     result = {
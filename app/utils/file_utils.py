@@ -1,37 +1,115 @@
 """
-File utility helpers (get_file_type, save uploaded file, etc)
+File utility helpers (classify_file/get_file_type, save uploaded file, etc)
 """
 
+import hashlib
+import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Tuple
+import zstandard
 from fastapi import UploadFile
 
-video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v', '.mpg', '.mpeg', '.3gp', '.ogv']
-audio_extensions = ['.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma', '.opus', '.amr']
+# Extension -> file type, one hash lookup per classification
+_EXT_TYPE = {
+    **{ext: 'video' for ext in ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v', '.mpg', '.mpeg', '.3gp', '.ogv')},
+    **{ext: 'audio' for ext in ('.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma', '.opus', '.amr')}
+}
+
+# Bytes of a file's header sniff_file_type looks at
+MAGIC_BYTES_SIZE = 16
+# (offset, signature, type) for uploads whose extension isn't recognised
+_MAGIC_TYPES = (
+    (4, b'ftypM4A', 'audio'),
+    (4, b'ftypM4B', 'audio'),
+    (4, b'ftyp', 'video'),          # MP4 / MOV / 3GP
+    (8, b'WAVE', 'audio'),          # RIFF WAVE
+    (8, b'AVI ', 'video'),          # RIFF AVI
+    (0, b'ID3', 'audio'),           # MP3 with ID3 tag
+    (0, b'fLaC', 'audio'),
+    (0, b'OggS', 'audio'),
+    (0, b'#!AMR', 'audio'),
+    (0, b'\x1aE\xdf\xa3', 'video'),  # Matroska / WebM
+    (0, b'FLV', 'video'),
+    (0, b'\x00\x00\x01\xba', 'video'),  # MPEG program stream
+    (0, b'0&\xb2u\x8ef\xcf\x11', 'video'),  # ASF (WMV / WMA)
+)
+
+# Read size when copying (and hashing) multipart uploads
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+
+@lru_cache(maxsize=2048)
+def classify_file(filename: str) -> Tuple[str, str]:
+    """Return (extension as written, 'video'/'audio'/'unknown') from one suffix parse"""
+    # Only the last path component counts, as with os.path.splitext (leading
+    # dots start a name, not an extension)
+    name = filename[max(filename.rfind('/'), filename.rfind('\\')) + 1:]
+    stem, dot, suffix = name.rpartition('.')
+    ext = '.' + suffix if dot and stem.strip('.') else ''
+    return ext, _EXT_TYPE.get(ext.lower(), 'unknown')
 
 def get_file_type(filename: str) -> str:
     """Determine if file is video or audio"""
-    ext = Path(filename).suffix.lower()
-    if ext in video_extensions:
-        return 'video'
-    elif ext in audio_extensions:
+    return classify_file(filename)[1]
+
+def sniff_file_type(head: bytes) -> str:
+    """Classify a file as video or audio from its first MAGIC_BYTES_SIZE bytes"""
+    for offset, signature, file_type in _MAGIC_TYPES:
+        if head.startswith(signature, offset):
+            return file_type
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # MPEG audio / ADTS AAC frame sync
         return 'audio'
-    else:
-        return 'unknown'
+    return 'unknown'
+
+def preallocate_file(fd: int, size: int):
+    """Reserve size bytes for fd up front so the filesystem can lay it out contiguously."""
+    if size > 0 and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            # Not supported by this filesystem; writes still work without it
+            pass
 
-def save_upload_file(upload_file: UploadFile, destination: Path):
+def save_upload_file(upload_file: UploadFile, destination: Path, hasher):
     """
-    Save a FastAPI UploadFile to destination Path.
+    Save a FastAPI UploadFile to destination Path, feeding its content to
+    hasher (for duplicate detection) in the same COPY_BUFFER_SIZE-chunk pass.
     """
-    with open(destination, "wb") as buffer:
-        # stream copy
-        shutil_write = None
+    src = upload_file.file
+    try:
+        with open(destination, "wb") as buffer:
+            while chunk := src.read(COPY_BUFFER_SIZE):
+                hasher.update(chunk)
+                buffer.write(chunk)
+    finally:
+        # ensure file-like is closed by FastAPI on client side
         try:
-            # use shutil.copyfileobj semantics without importing shutil repeatedly
-            from shutil import copyfileobj
-            copyfileobj(upload_file.file, buffer)
-        finally:
-            # ensure file-like is closed by FastAPI on client side
-            try:
-                upload_file.file.close()
-            except Exception:
-                pass
+            src.close()
+        except Exception:
+            pass
+
+def content_hasher():
+    """Return the hasher used to fingerprint uploads for duplicate detection."""
+    return hashlib.blake2b(digest_size=16)
+
+def unlink_if_exists(path):
+    """Delete path, ignoring a file that's already gone (one syscall, no exists() race)."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def compress_file(source: Path, destination: Path, level: int = 3):
+    """zstd-compress source into destination, then remove source."""
+    cctx = zstandard.ZstdCompressor(level=level)
+    with open(source, "rb") as fin, open(destination, "wb") as fout:
+        cctx.copy_stream(fin, fout, size=os.fstat(fin.fileno()).st_size)
+    os.unlink(source)
+
+def iter_decompressed(path: Path):
+    """Yield the decompressed contents of a zstd file in chunks."""
+    with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+        while chunk := reader.read(DECOMPRESS_CHUNK_SIZE):
+            yield chunk
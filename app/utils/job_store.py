@@ -0,0 +1,206 @@
+"""
+Job store: async access to job records.
+
+Uses Redis (hash per job at job:{job_id}, a jobs_by_created sorted set for
+listing and hash:{content_key} entries for duplicate uploads) when REDIS_URL
+is set, so every uvicorn worker sees the same
+jobs. Without REDIS_URL it falls back to the in-process jobs_db dict.
+
+Every update is also published (Redis channel job:{job_id}:events, or
+in-process queues) for subscribers such as the job events stream.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import List, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+
+from app.config import REDIS_URL
+
+# In-memory storage for job status (used when REDIS_URL is not set)
+jobs_db = {}
+# Job IDs newest first; jobs are created in time order so this stays sorted
+jobs_index = deque()
+# Content key (upload digest + options) -> completed job ID
+jobs_by_content = {}
+# job_id -> asyncio.Queue per in-process event subscriber
+_subscribers = {}
+
+JOBS_BY_CREATED_KEY = "jobs_by_created"
+
+_redis = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Return the shared Redis client, or None when REDIS_URL is not set."""
+    global _redis
+    if REDIS_URL and _redis is None:
+        _redis = redis.from_url(REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _events_key(job_id: str) -> str:
+    return f"job:{job_id}:events"
+
+
+def _content_key(content_key: str) -> str:
+    return f"hash:{content_key}"
+
+
+def _encode(mapping: dict) -> dict:
+    # Hash values are strings; JSON keeps None/ints intact on the way back
+    return {field: orjson.dumps(value) for field, value in mapping.items()}
+
+
+def _decode(mapping: dict) -> dict:
+    return {field: orjson.loads(value) for field, value in mapping.items()}
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    """Return the job record, or None if it doesn't exist."""
+    r = get_redis()
+    if r is None:
+        return jobs_db.get(job_id)
+    data = await r.hgetall(_job_key(job_id))
+    return _decode(data) if data else None
+
+
+async def set_job(job_id: str, mapping: dict):
+    """Create (or replace) a job record."""
+    r = get_redis()
+    if r is None:
+        if job_id not in jobs_db:
+            jobs_index.appendleft(job_id)
+        jobs_db[job_id] = mapping
+        return
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(job_id), mapping=_encode(mapping))
+        pipe.zadd(JOBS_BY_CREATED_KEY, {job_id: mapping['created_at']}, nx=True)
+        await pipe.execute()
+
+
+async def update_fields(job_id: str, **fields) -> bool:
+    """Update fields of an existing job. Returns False if the job is gone."""
+    r = get_redis()
+    if r is None:
+        job = jobs_db.get(job_id)
+        if job is None:
+            return False
+        job.update(fields)
+        for queue in _subscribers.get(job_id, ()):
+            queue.put_nowait(fields)
+        return True
+    key = _job_key(job_id)
+    if not await r.exists(key):
+        return False
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=_encode(fields))
+        pipe.publish(_events_key(job_id), orjson.dumps(fields))
+        await pipe.execute()
+    return True
+
+
+async def _iter_queue(queue: asyncio.Queue, idle_timeout: Optional[float]):
+    while True:
+        try:
+            fields = await asyncio.wait_for(queue.get(), idle_timeout)
+        except asyncio.TimeoutError:
+            fields = None
+        yield fields
+
+
+async def _iter_pubsub(pubsub, idle_timeout: Optional[float]):
+    while True:
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=idle_timeout)
+        yield orjson.loads(message['data']) if message is not None else None
+
+
+@asynccontextmanager
+async def subscribe(job_id: str, idle_timeout: Optional[float] = None):
+    """Yield an async iterator over the field updates of a job.
+
+    With idle_timeout, the iterator yields None after that many seconds
+    without an update (or, with Redis, on other quiet wakeups).
+    """
+    r = get_redis()
+    if r is None:
+        queue = asyncio.Queue()
+        _subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            yield _iter_queue(queue, idle_timeout)
+        finally:
+            queues = _subscribers.get(job_id)
+            queues.discard(queue)
+            if not queues:
+                del _subscribers[job_id]
+        return
+    pubsub = r.pubsub()
+    await pubsub.subscribe(_events_key(job_id))
+    try:
+        yield _iter_pubsub(pubsub, idle_timeout)
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+
+async def list_jobs(limit: int) -> Tuple[List[dict], int]:
+    """Return the newest `limit` jobs and the total job count."""
+    r = get_redis()
+    if r is None:
+        return [jobs_db[job_id] for job_id in islice(jobs_index, max(limit, 0))], len(jobs_db)
+    if limit <= 0:
+        return [], await r.zcard(JOBS_BY_CREATED_KEY)
+    job_ids = await r.zrevrange(JOBS_BY_CREATED_KEY, 0, limit - 1)
+    async with r.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.hgetall(_job_key(job_id))
+        pipe.zcard(JOBS_BY_CREATED_KEY)
+        *records, total = await pipe.execute()
+    return [_decode(data) for data in records if data], total
+
+
+async def delete_job(job_id: str):
+    """Remove a job record (and its duplicate-upload entry)."""
+    r = get_redis()
+    if r is None:
+        job = jobs_db.pop(job_id, None)
+        if job is not None:
+            jobs_index.remove(job_id)
+            if job.get('content_key') and jobs_by_content.get(job['content_key']) == job_id:
+                del jobs_by_content[job['content_key']]
+        return
+    content_key = await r.hget(_job_key(job_id), 'content_key')
+    content_key = orjson.loads(content_key) if content_key else None
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.delete(_job_key(job_id))
+        pipe.zrem(JOBS_BY_CREATED_KEY, job_id)
+        if content_key and await r.hget(_content_key(content_key), 'job_id') == job_id:
+            pipe.delete(_content_key(content_key))
+        await pipe.execute()
+
+
+async def get_job_by_content(content_key: str) -> Optional[dict]:
+    """Return the completed job recorded for this content key, if any."""
+    r = get_redis()
+    if r is None:
+        job_id = jobs_by_content.get(content_key)
+    else:
+        job_id = await r.hget(_content_key(content_key), 'job_id')
+    return await get_job(job_id) if job_id else None
+
+
+async def set_job_content(content_key: str, job_id: str):
+    """Record job_id as the completed result for this content key."""
+    r = get_redis()
+    if r is None:
+        jobs_by_content[content_key] = job_id
+        return
+    await r.hset(_content_key(content_key), 'job_id', job_id)
@@ -1,24 +1,108 @@
 """
-Job utilities: in-memory jobs DB and helper to update status.
+Job utilities: helper to update job status in the job store.
 """
 
+import asyncio
+import time
 from datetime import datetime
 from typing import Optional
 
-# In-memory storage for job status (same as original; swap to Redis/DB in production)
-jobs_db = {}
-
-def update_job_status(job_id: str, status: str, progress: str = "", error: Optional[str] = None,
-                      transcription: Optional[str] = None, result_file: Optional[str] = None):
-    """Update job status in the in-memory jobs_db"""
-    if job_id in jobs_db:
-        jobs_db[job_id]['status'] = status
-        jobs_db[job_id]['progress'] = progress
-        if error:
-            jobs_db[job_id]['error'] = error
-        if transcription:
-            jobs_db[job_id]['transcription'] = transcription
-        if result_file:
-            jobs_db[job_id]['result_file'] = result_file
-        if status in ('completed', 'failed'):
-            jobs_db[job_id]['completed_at'] = datetime.now().isoformat()
+from app.utils import job_store
+
+# Stored for the server's own use, never returned by the API
+_INTERNAL_FIELDS = frozenset({'content_key'})
+
+# Transient progress updates are written at most this often per job
+PROGRESS_MIN_INTERVAL = 0.25
+
+# job_id -> last written (status, progress), when it was written, any update
+# held back by the interval (flushed by a timer) and the flush task writing it
+_progress_state = {}
+_flush_tasks = set()
+
+def format_timestamp(ns: Optional[int]) -> Optional[str]:
+    """ISO 8601 string for a time.time_ns() timestamp (None passes through)"""
+    if ns is None:
+        return None
+    seconds, remainder = divmod(ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=remainder // 1000).isoformat()
+
+def job_for_response(job: dict, fields=None) -> dict:
+    """Copy of a job record (optionally only `fields`) with ISO timestamps"""
+    if fields:
+        view = {field: job.get(field) for field in fields}
+    else:
+        view = {field: value for field, value in job.items() if field not in _INTERNAL_FIELDS}
+    view['created_at'] = format_timestamp(job.get('created_at'))
+    view['completed_at'] = format_timestamp(job.get('completed_at'))
+    return view
+
+async def _flush_pending(job_id: str):
+    state = _progress_state.get(job_id)
+    if state is None or state['pending'] is None:
+        return
+    fields, state['pending'], state['timer'] = state['pending'], None, None
+    state['last'] = (fields['status'], fields['progress'])
+    state['sent_at'] = time.monotonic()
+    await job_store.update_fields(job_id, **fields)
+
+def _schedule_flush(job_id: str):
+    task = asyncio.ensure_future(_flush_pending(job_id))
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+    state = _progress_state.get(job_id)
+    if state is not None:
+        state['flush'] = task
+
+async def _wait_for_flush(state: dict):
+    # A flush already writing must land before any later update does
+    if state['flush'] is not None and not state['flush'].done():
+        await asyncio.wait([state['flush']])
+
+async def update_job_status(job_id: str, status: str, progress: str = "", error: Optional[str] = None,
+                            transcription: Optional[str] = None, result_file: Optional[str] = None):
+    """Update job status in the job store.
+
+    Terminal states are written immediately (after any flush in progress).
+    Transient progress updates are skipped when unchanged and coalesced to
+    one write per PROGRESS_MIN_INTERVAL, with the latest one flushed when the
+    interval ends.
+    """
+    fields = {'status': status, 'progress': progress}
+    if error:
+        fields['error'] = error
+    if transcription:
+        fields['transcription'] = transcription
+    if result_file:
+        fields['result_file'] = result_file
+
+    if status in ('completed', 'failed'):
+        fields['completed_at'] = time.time_ns()
+        state = _progress_state.pop(job_id, None)
+        if state is not None:
+            if state['timer'] is not None:
+                state['timer'].cancel()
+            await _wait_for_flush(state)
+        await job_store.update_fields(job_id, **fields)
+        return
+
+    state = _progress_state.setdefault(
+        job_id, {'last': None, 'sent_at': 0.0, 'pending': None, 'timer': None, 'flush': None}
+    )
+    if state['pending'] is None and state['last'] == (status, progress):
+        return
+    wait = state['sent_at'] + PROGRESS_MIN_INTERVAL - time.monotonic()
+    if wait > 0:
+        state['pending'] = fields
+        if state['timer'] is None:
+            state['timer'] = asyncio.get_running_loop().call_later(wait, _schedule_flush, job_id)
+        return
+
+    if state['timer'] is not None:
+        # This update supersedes one whose flush is late
+        state['timer'].cancel()
+        state['timer'] = state['pending'] = None
+    await _wait_for_flush(state)
+    state['last'] = (status, progress)
+    state['sent_at'] = time.monotonic()
+    await job_store.update_fields(job_id, **fields)
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from app.utils.file_utils import classify_file
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("meeting.mp4", (".mp4", "video")),
+    ("Meeting.MP3", (".MP3", "audio")),
+    ("archive.tar.flac", (".flac", "audio")),
+    ("notes.txt", (".txt", "unknown")),
+    ("recording", ("", "unknown")),
+    (".mp4", ("", "unknown")),
+    ("meetings.2024/recording", ("", "unknown")),
+    ("meetings.2024\\recording", ("", "unknown")),
+    ("meetings.2024/call.wav", (".wav", "audio")),
+])
+def test_classify_file(filename, expected):
+    assert classify_file(filename) == expected
+
+
+@pytest.mark.parametrize("filename", ["a.mp4", "a.b.wav", "noext", ".hidden", "..mp4", "dir.x/file", "dir/.mp3"])
+def test_classify_file_extension_matches_splitext(filename):
+    assert classify_file(filename)[0] == os.path.splitext(filename)[1]
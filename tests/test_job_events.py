@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.routers import jobs
+from app.utils import job_store
+
+
+@pytest.fixture
+def job(monkeypatch):
+    monkeypatch.setattr(job_store, "jobs_db", {})
+    monkeypatch.setattr(job_store, "_subscribers", {})
+    monkeypatch.setattr(jobs, "EVENTS_KEEPALIVE_INTERVAL", 0.05)
+    job_store.jobs_db["job"] = {
+        'job_id': "job", 'status': "processing", 'progress': "", 'filename': "a.mp3",
+        'created_at': 0, 'completed_at': None, 'error': None, 'result_file': None, 'transcription': None
+    }
+    return "job"
+
+
+async def collect(job_id, during):
+    response = await jobs.job_events(job_id)
+    events = []
+
+    async def read():
+        async for event in response.body_iterator:
+            events.append(event)
+
+    reader = asyncio.create_task(read())
+    await during()
+    await asyncio.wait_for(reader, 1)
+    return events
+
+
+def test_events_stream_ends_when_job_completes(job):
+    async def during():
+        await asyncio.sleep(0.01)
+        await job_store.update_fields(job, status="completed", progress="done", completed_at=0)
+
+    events = asyncio.run(collect(job, during))
+    assert events[0].startswith(b"data: ")
+    assert b'"completed"' in events[-1]
+
+
+def test_events_stream_sends_keepalives_and_ends_when_job_is_deleted(job):
+    async def during():
+        await asyncio.sleep(0.2)
+        job_store.jobs_db.pop(job)
+
+    events = asyncio.run(collect(job, during))
+    assert events[0].startswith(b"data: ")
+    assert b": keepalive\n\n" in events[1:]
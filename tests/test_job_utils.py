@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.utils import job_store, job_utils
+from app.utils.job_utils import PROGRESS_MIN_INTERVAL, update_job_status
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Record the fields of every job store write, in the order they land."""
+    landed = []
+
+    async def update_fields(job_id, **fields):
+        landed.append(fields)
+        return True
+
+    monkeypatch.setattr(job_store, "update_fields", update_fields)
+    monkeypatch.setattr(job_utils, "_progress_state", {})
+    return landed
+
+
+def statuses(writes):
+    return [(fields['status'], fields['progress']) for fields in writes]
+
+
+def test_unchanged_progress_is_skipped(writes):
+    async def run():
+        await update_job_status("job", "processing", "Analyzing file...")
+        await update_job_status("job", "processing", "Analyzing file...")
+
+    asyncio.run(run())
+    assert statuses(writes) == [("processing", "Analyzing file...")]
+
+
+def test_rapid_updates_coalesce_to_the_latest(writes):
+    async def run():
+        await update_job_status("job", "processing", "a")
+        await update_job_status("job", "processing", "b")
+        await update_job_status("job", "processing", "c")
+        assert statuses(writes) == [("processing", "a")]
+        await asyncio.sleep(PROGRESS_MIN_INTERVAL * 2)
+
+    asyncio.run(run())
+    assert statuses(writes) == [("processing", "a"), ("processing", "c")]
+
+
+def test_terminal_update_drops_pending_progress(writes):
+    async def run():
+        await update_job_status("job", "processing", "a")
+        await update_job_status("job", "processing", "b")
+        await update_job_status("job", "completed", "done")
+        await asyncio.sleep(PROGRESS_MIN_INTERVAL * 2)
+
+    asyncio.run(run())
+    assert statuses(writes) == [("processing", "a"), ("completed", "done")]
+
+
+def test_terminal_update_lands_after_flush_in_progress(monkeypatch, writes):
+    async def run():
+        started = asyncio.Event()
+        record = job_store.update_fields
+
+        async def slow_update_fields(job_id, **fields):
+            if fields['status'] == 'processing' and fields['progress'] == 'b':
+                started.set()
+                await asyncio.sleep(PROGRESS_MIN_INTERVAL)
+            return await record(job_id, **fields)
+
+        monkeypatch.setattr(job_store, "update_fields", slow_update_fields)
+        await update_job_status("job", "processing", "a")
+        await update_job_status("job", "processing", "b")
+        await started.wait()
+        await update_job_status("job", "completed", "done")
+
+    asyncio.run(run())
+    assert statuses(writes) == [("processing", "a"), ("processing", "b"), ("completed", "done")]
+
+
+def test_late_flush_does_not_overwrite_newer_progress(writes):
+    async def run():
+        await update_job_status("job", "processing", "a")
+        await update_job_status("job", "processing", "b")
+        # The interval has passed but the loop hasn't run the flush timer yet
+        job_utils._progress_state["job"]['sent_at'] -= PROGRESS_MIN_INTERVAL
+        await update_job_status("job", "processing", "c")
+        await asyncio.sleep(PROGRESS_MIN_INTERVAL * 2)
+
+    asyncio.run(run())
+    assert statuses(writes) == [("processing", "a"), ("processing", "c")]
+
+
+def test_job_for_response_hides_internal_fields():
+    job = {'job_id': "job", 'status': "queued", 'created_at': 0, 'completed_at': None, 'content_key': "digest:en-US:2:5"}
+    view = job_utils.job_for_response(job)
+    assert 'content_key' not in view
+    assert view['job_id'] == "job"
@@ -0,0 +1,20 @@
+import pytest
+
+from app.utils.responses import accepts_encoding
+
+
+@pytest.mark.parametrize("header, accepted", [
+    ("zstd", True),
+    ("gzip, zstd", True),
+    ("gzip, zstd;q=0.5", True),
+    ("gzip, ZSTD ; q=1", True),
+    ("gzip, zstd;q=0", False),
+    ("gzip, zstd;q=0.000", False),
+    ("gzip", False),
+    ("", False),
+    ("*", True),
+    ("*, zstd;q=0", False),
+    ("zstdx, gzip", False),
+])
+def test_accepts_encoding(header, accepted):
+    assert accepts_encoding(header, "zstd") is accepted
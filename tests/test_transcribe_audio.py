@@ -0,0 +1,62 @@
+import threading
+import time
+
+from google.api_core.future import polling
+
+import transcribe_audio
+
+
+class Blob:
+    def __init__(self, name):
+        self.name = name
+
+
+class Bucket:
+    def __init__(self, blobs):
+        self.blobs = blobs
+
+    def list_blobs(self, prefix=None):
+        return list(self.blobs)
+
+
+class Client:
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+
+class Operation(polling.PollingFuture):
+    """Finishes `duration` seconds after it's created."""
+
+    def __init__(self, duration):
+        super().__init__()
+        self._finish_at = time.monotonic() + duration
+
+    def done(self, retry=None):
+        if not self._result_set and time.monotonic() >= self._finish_at:
+            self.set_result(None)
+        return self._result_set
+
+    def cancel(self):
+        return False
+
+    def cancelled(self):
+        return False
+
+
+def test_download_and_format_transcription_collects_shards_while_running(monkeypatch):
+    bucket = Bucket([Blob("out/a.json")])
+    monkeypatch.setattr(transcribe_audio, "_storage_client", lambda: Client(bucket))
+    monkeypatch.setattr(transcribe_audio, "_shard_segments", lambda blob: [{"speaker": "1", "text": blob.name}])
+    monkeypatch.setattr(transcribe_audio, "SHARD_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(transcribe_audio, "SHARD_POLL_MAX_INTERVAL", 0.05)
+    monkeypatch.setattr(transcribe_audio, "MAX_AUDIO_LENGTH_SECS", 2)
+
+    operation = Operation(duration=0.5)
+    threading.Timer(0.3, bucket.blobs.append, args=(Blob("out/b.json"),)).start()
+
+    output = transcribe_audio.download_and_format_transcription("gs://bk/out", "bk", operation)
+
+    assert "out/a.json" in output and "out/b.json" in output
@@ -0,0 +1,66 @@
+import re
+import subprocess
+import sys
+from contextlib import contextmanager
+
+import pytest
+import requests
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+from app.services import transcription_service
+
+CHUNK_SIZE = 256 * 1024
+
+
+class FakeGCS:
+    """Transport answering a resumable upload like GCS does."""
+
+    def __init__(self):
+        self.received = bytearray()
+        self.is_mtls = False
+
+    def request(self, method, url, data=None, headers=None, timeout=None, **kwargs):
+        response = requests.Response()
+        response.headers["Content-Type"] = "application/json"
+        if method == "POST":
+            response.status_code = 200
+            response.headers["Location"] = "https://upload.example/session"
+            response._content = b"{}"
+            return response
+        start, end, total = re.match(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)", headers["content-range"]).groups()
+        assert start is None or int(start) == len(self.received)
+        self.received += data
+        if total != "*" and len(self.received) == int(total):
+            response.status_code = 200
+            response._content = b'{"name": "audio.flac", "bucket": "bucket"}'
+        else:
+            response.status_code = 308
+            response.headers["Range"] = f"bytes=0-{len(self.received) - 1}"
+            response._content = b""
+        return response
+
+
+# A short last chunk, and an exact multiple that ends with an empty one
+@pytest.mark.parametrize("audio_size", [2 * CHUNK_SIZE + 1000, 3 * CHUNK_SIZE])
+def test_extract_and_upload_streams_pipe(monkeypatch, tmp_path, audio_size):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"")
+    audio = bytes(range(256)) * (audio_size // 256) + b"x" * (audio_size % 256)
+    producer = f"import sys; sys.stdout.buffer.write(bytes(range(256)) * {audio_size // 256} + b'x' * {audio_size % 256})"
+
+    @contextmanager
+    def fake_stream(video_path, remove_silence=False):
+        with subprocess.Popen([sys.executable, "-c", producer], stdout=subprocess.PIPE) as proc:
+            yield proc.stdout
+
+    fake_gcs = FakeGCS()
+    client = storage.Client(project="test", credentials=AnonymousCredentials(), _http=fake_gcs)
+    monkeypatch.setattr(transcription_service, "_storage_client", lambda: client)
+    monkeypatch.setattr(transcription_service, "stream_audio_from_video", fake_stream)
+    monkeypatch.setattr(transcription_service, "STREAM_UPLOAD_CHUNK_SIZE", CHUNK_SIZE)
+
+    uri = transcription_service.extract_and_upload(str(video), "bucket", "audio.flac")
+
+    assert uri == "gs://bucket/audio.flac"
+    assert bytes(fake_gcs.received) == audio
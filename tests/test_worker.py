@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.background import worker
+from app.background.job_queue import TRANSCRIPTION_QUEUE_KEY
+from app.utils import job_store
+
+
+class BlockingFakeRedis(fakeredis.FakeAsyncRedis):
+    """fakeredis returns from BLMOVE at once; wait for an item like Redis does."""
+
+    async def blmove(self, first_list, second_list, timeout, src="LEFT", dest="RIGHT"):
+        while (value := await self.lmove(first_list, second_list, src, dest)) is None:
+            await asyncio.sleep(0.01)
+        return value
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    r = BlockingFakeRedis(decode_responses=True)
+    monkeypatch.setattr(job_store, "_redis", r)
+    monkeypatch.setattr(job_store, "get_redis", lambda: r)
+    monkeypatch.setattr(worker, "get_redis", lambda: r)
+    return r
+
+
+def payload(job_id):
+    return json.dumps({'job_id': job_id, 'file_path': f"uploads/{job_id}.mp3"})
+
+
+async def run_until(condition, worker_name="w1"):
+    task = asyncio.create_task(worker.run_worker(concurrency=2, worker_name=worker_name))
+    try:
+        for _ in range(200):
+            if await condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("condition not reached")
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def test_finished_jobs_leave_the_processing_list(monkeypatch, redis, caplog):
+    ran = []
+
+    async def process_transcription(**job):
+        ran.append(job['job_id'])
+        if job['job_id'] == "bad":
+            raise ValueError("boom")
+
+    monkeypatch.setattr(worker, "process_transcription", process_transcription)
+
+    async def run():
+        await redis.lpush(TRANSCRIPTION_QUEUE_KEY, payload("a"), payload("bad"), "not json")
+
+        async def drained():
+            return (len(ran) == 2 and not await redis.llen(TRANSCRIPTION_QUEUE_KEY)
+                    and not await redis.llen(worker.processing_key("w1")))
+
+        await run_until(drained)
+
+    asyncio.run(run())
+    assert sorted(ran) == ["a", "bad"]
+    # The malformed payload and the escaped exception are logged, not lost
+    assert sorted(record.message for record in caplog.records) == [
+        "Transcription job failed: not json",
+        f"Transcription job failed: {payload('bad')}",
+    ]
+
+
+def test_unfinished_jobs_are_requeued_on_restart(monkeypatch, redis):
+    ran = []
+
+    async def run():
+        blocked = asyncio.Event()
+
+        async def hang(**job):
+            blocked.set()
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(worker, "process_transcription", hang)
+        await redis.lpush(TRANSCRIPTION_QUEUE_KEY, payload("a"))
+
+        async def is_running():
+            return blocked.is_set()
+
+        # The worker is stopped mid-job: the job must stay recorded
+        await run_until(is_running)
+        assert await redis.lrange(worker.processing_key("w1"), 0, -1) == [payload("a")]
+
+        async def finish(**job):
+            ran.append(job['job_id'])
+
+        monkeypatch.setattr(worker, "process_transcription", finish)
+
+        async def reran():
+            return ran == ["a"] and not await redis.llen(worker.processing_key("w1"))
+
+        await run_until(reran)
+
+    asyncio.run(run())
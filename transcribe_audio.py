@@ -4,23 +4,141 @@ Audio Transcription Script with Speaker Diarization
 Uses Google Cloud Speech-to-Text V2 API with Chirp 3 model for improved accuracy
 """
 
+import hashlib
 import os
+import subprocess
 import sys
-import json
-from google.api_core.client_options import ClientOptions
-from google.cloud.speech_v2 import SpeechClient
-from google.cloud.speech_v2.types import cloud_speech
-from google.cloud import storage
-from google.auth import default
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import groupby
+from shutil import which
+import ijson
+import orjson
 from dotenv import load_dotenv
+# Google Cloud libraries are imported where they're used: they take hundreds
+# of ms to load, which usage errors and argument checks shouldn't pay for
 
 # Load environment variables from .env file
 load_dotenv()
 
 MAX_AUDIO_LENGTH_SECS = 8 * 60 * 60  # 8 hours
 
+# Files up to this size are uploaded in one request instead of 100 MB
+# resumable chunks (the chunk is held in memory while it's sent)
+SINGLE_SHOT_UPLOAD_MAX_SIZE = 256 * 1024 * 1024
+# Resumable upload chunk sizes must be a multiple of this
+UPLOAD_CHUNK_ALIGNMENT = 256 * 1024
 
-def upload_to_gcs(local_file_path, bucket_name, blob_name):
+# --parallel-upload: files above PARALLEL_UPLOAD_MIN_SIZE are sent as
+# PARALLEL_UPLOAD_CHUNK_SIZE parts, UPLOAD_MAX_WORKERS at a time
+PARALLEL_UPLOAD_MIN_SIZE = 64 * 1024 * 1024
+PARALLEL_UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024
+UPLOAD_MAX_WORKERS = int(os.environ.get("UPLOAD_MAX_WORKERS", "8"))
+
+# Audio larger than this (and not already Opus) is transcoded to speech-tuned
+# Opus before upload when FFmpeg is available
+OPUS_TRANSCODE_MIN_SIZE = 20 * 1024 * 1024
+_FFMPEG_PATH = which("ffmpeg")
+_FFPROBE_PATH = which("ffprobe")
+
+# Read size when hashing the audio for its content-addressed blob name
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Result shards downloaded at once
+DOWNLOAD_MAX_WORKERS = 16
+# Shards up to this size are parsed whole with orjson, larger ones streamed with ijson
+IN_MEMORY_PARSE_MAX_SIZE = 16 * 1024 * 1024
+# While recognition runs, the output folder is listed for finished shards this
+# often, backing off exponentially up to SHARD_POLL_MAX_INTERVAL
+SHARD_POLL_INTERVAL = 5
+SHARD_POLL_MAX_INTERVAL = 60
+
+
+@lru_cache(maxsize=1)
+def _credentials():
+    """Application Default Credentials, looked up once per run."""
+    from google.auth import default
+    return default()
+
+
+@lru_cache(maxsize=1)
+def _storage_client():
+    from google.cloud import storage
+    credentials, project = _credentials()
+    return storage.Client(credentials=credentials, project=project)
+
+
+@lru_cache(maxsize=1)
+def _speech_client():
+    from google.api_core.client_options import ClientOptions
+    from google.cloud.speech_v2 import SpeechClient
+    credentials, _ = _credentials()
+    return SpeechClient(
+        credentials=credentials,
+        client_options=ClientOptions(
+            api_endpoint="us-speech.googleapis.com",
+        ),
+    )
+
+
+def hash_file(path):
+    """Hex blake2b digest of a file's contents, read in HASH_CHUNK_SIZE chunks."""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _audio_codec(path):
+    """Codec of the first audio stream (ffprobe), or None if it can't be probed."""
+    if _FFPROBE_PATH is None:
+        return None
+    result = subprocess.run(
+        [_FFPROBE_PATH, '-v', 'error', '-select_streams', 'a:0',
+         '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1', path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    return result.stdout.decode('utf-8', 'replace').strip() or None
+
+
+def needs_opus_transcode(path):
+    """Whether upload_to_gcs(..., transcode=True) should shrink this file first."""
+    return (_FFMPEG_PATH is not None
+            and not path.lower().endswith('.opus')
+            and os.path.getsize(path) > OPUS_TRANSCODE_MIN_SIZE
+            # Opus in an .ogg (or other) container is already as small
+            and _audio_codec(path) != 'opus')
+
+
+def transcode_to_opus(path):
+    """Encode path as mono 16 kHz Opus (24k, VoIP tuning) into a temp .ogg; returns its path."""
+    fd, output_path = tempfile.mkstemp(suffix='.ogg')
+    os.close(fd)
+    command = [
+        _FFMPEG_PATH, '-nostats', '-loglevel', 'error',
+        '-i', path,
+        '-vn',
+        '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip',
+        '-ac', '1', '-ar', '16000',
+        '-y', output_path
+    ]
+    try:
+        subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE, check=True)
+    except subprocess.CalledProcessError as e:
+        os.unlink(output_path)
+        raise RuntimeError(f"FFmpeg failed:\n{e.stderr.decode('utf-8', 'replace')}") from e
+    except BaseException:
+        os.unlink(output_path)
+        raise
+    return output_path
+
+
+def upload_to_gcs(local_file_path, bucket_name, blob_name, parallel=False, skip_if_exists=False,
+                  transcode=False):
     """
     Upload a local file to Google Cloud Storage.
     Uses Application Default Credentials (gcloud auth application-default login).
@@ -29,24 +147,56 @@ def upload_to_gcs(local_file_path, bucket_name, blob_name):
         local_file_path (str): Path to the local audio file
         bucket_name (str): GCS bucket name
         blob_name (str): Name for the file in GCS
+        parallel (bool): Upload large files as concurrent parts (default: False)
+        skip_if_exists (bool): Don't upload if blob_name already exists with the
+            same size; for content-addressed names (default: False)
+        transcode (bool): Upload an Opus transcode of the file instead
+            (see needs_opus_transcode) (default: False)
     
     Returns:
         str: GCS URI of the uploaded file
     """
-    print(f"Uploading {local_file_path} to gs://{bucket_name}/{blob_name}...")
+    gcs_uri = f"gs://{bucket_name}/{blob_name}"
+    bucket = _storage_client().bucket(bucket_name)
+    size = os.path.getsize(local_file_path)
     
-    # Get default credentials
-    credentials, project = default()
+    if skip_if_exists:
+        existing = bucket.get_blob(blob_name)
+        # A transcode's size isn't known up front; its name already pins the source
+        if existing is not None and (transcode or existing.size == size):
+            print(f"Already uploaded: {gcs_uri}")
+            return gcs_uri
     
-    # Initialize storage client with credentials
-    storage_client = storage.Client(credentials=credentials, project=project)
+    upload_path = local_file_path
+    if transcode:
+        print(f"Compressing {local_file_path} to Opus for upload...")
+        upload_path = transcode_to_opus(local_file_path)
+        size = os.path.getsize(upload_path)
     
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
+    print(f"Uploading {local_file_path} to {gcs_uri}...")
     
-    blob.upload_from_filename(local_file_path)
+    blob = bucket.blob(blob_name)
+    try:
+        if parallel and size > PARALLEL_UPLOAD_MIN_SIZE:
+            from google.cloud.storage import transfer_manager
+            # XML multipart upload: parts go up concurrently, GCS assembles them
+            transfer_manager.upload_chunks_concurrently(
+                upload_path,
+                blob,
+                chunk_size=PARALLEL_UPLOAD_CHUNK_SIZE,
+                worker_type=transfer_manager.THREAD,
+                max_workers=UPLOAD_MAX_WORKERS
+            )
+        else:
+            if size <= SINGLE_SHOT_UPLOAD_MAX_SIZE:
+                # One chunk covering the whole file: no per-chunk round trips
+                blob.chunk_size = max(-(-size // UPLOAD_CHUNK_ALIGNMENT), 1) * UPLOAD_CHUNK_ALIGNMENT
+            with open(upload_path, 'rb') as f:
+                blob.upload_from_file(f, size=size, rewind=False)
+    finally:
+        if upload_path != local_file_path:
+            os.unlink(upload_path)
     
-    gcs_uri = f"gs://{bucket_name}/{blob_name}"
     print(f"File uploaded successfully to {gcs_uri}")
     return gcs_uri
 
@@ -67,19 +217,13 @@ def transcribe_audio_with_diarization(audio_gcs_uri, gcs_output_folder, project_
         max_speaker_count (int): Maximum number of speakers (default: 5)
     
     Returns:
-        dict: Transcription results with speaker information
+        Operation: The running batch recognition (a future); results land in gcs_output_folder
     """
     
-    # Get default credentials (from gcloud auth application-default login)
-    credentials, _ = default()
+    from google.cloud.speech_v2.types import cloud_speech
     
-    # Initialize the Speech client with credentials and US endpoint
-    client = SpeechClient(
-        credentials=credentials,
-        client_options=ClientOptions(
-            api_endpoint="us-speech.googleapis.com",
-        ),
-    )
+    # Speech client on the US endpoint (credentials from gcloud auth application-default login)
+    client = _speech_client()
     
     print(f"Processing audio file: {audio_gcs_uri}")
     print("Using Chirp 3 model for improved accuracy...")
@@ -119,102 +263,123 @@ def transcribe_audio_with_diarization(audio_gcs_uri, gcs_output_folder, project_
     # Perform the transcription (long-running operation)
     operation = client.batch_recognize(request=request)
     
-    print("Waiting for operation to complete...")
-    response = operation.result(timeout=3 * MAX_AUDIO_LENGTH_SECS)
-    
-    return response
+    # Not waited on here: results are collected from gcs_output_folder while it runs
+    return operation
+
+
+def _speaker_label(word_info):
+    return word_info.get('speakerLabel', word_info.get('speakerTag', 'Unknown'))
+
+
+def _segments_from_results(results):
+    """Speaker segments from an iterable of recognition results."""
+    segments = []
+    for res in results:
+        if 'alternatives' in res and len(res['alternatives']) > 0:
+            alternative = res['alternatives'][0]
+            
+            if 'words' in alternative:
+                # One segment per run of consecutive words by the same speaker
+                for speaker, words in groupby(alternative['words'], key=_speaker_label):
+                    segments.append({
+                        'speaker': speaker,
+                        'text': ' '.join([word_info.get('word', '') for word_info in words])
+                    })
+    return segments
+
 
+def _shard_segments(blob):
+    """Speaker segments of one result shard."""
+    print(f"Processing {blob.name}...")
+    if blob.size is not None and blob.size <= IN_MEMORY_PARSE_MAX_SIZE:
+        # Small shards: raw bytes straight into orjson (no text decode step)
+        return _segments_from_results(orjson.loads(blob.download_as_bytes()).get('results', ()))
+    with blob.open('rb') as f:
+        # Large shards: one result at a time instead of the whole document in memory
+        return _segments_from_results(ijson.items(f, 'results.item'))
 
-def download_and_format_transcription(gcs_output_folder, bucket_name):
+
+def download_and_format_transcription(gcs_output_folder, bucket_name, operation=None):
     """
     Download and format the transcription results from GCS.
     Uses Application Default Credentials (gcloud auth application-default login).
     
+    When the still-running batch recognition operation is passed, shards are
+    downloaded as they appear in the output folder instead of after it ends.
+    
     Args:
         gcs_output_folder (str): GCS folder containing transcription results
         bucket_name (str): GCS bucket name
+        operation: Batch recognition operation writing to gcs_output_folder
     
     Returns:
         str: Formatted transcription text
     """
     print(f"Downloading transcription results from {gcs_output_folder}...")
     
-    # Get default credentials
-    credentials, project = default()
-    
-    # Initialize storage client with credentials
-    storage_client = storage.Client(credentials=credentials, project=project)
-    
-    bucket = storage_client.bucket(bucket_name)
+    bucket = _storage_client().bucket(bucket_name)
     
     # List all JSON files in the output folder
     prefix = gcs_output_folder.replace(f"gs://{bucket_name}/", "")
-    blobs = bucket.list_blobs(prefix=prefix)
     
-    transcription_segments = []
-    
-    for blob in blobs:
-        if blob.name.endswith('.json'):
-            print(f"Processing {blob.name}...")
-            content = blob.download_as_text()
-            result = json.loads(content)
-            
-            # Extract transcription with speaker labels
-            if 'results' in result:
-                for res in result['results']:
-                    if 'alternatives' in res and len(res['alternatives']) > 0:
-                        alternative = res['alternatives'][0]
-                        
-                        if 'words' in alternative:
-                            current_speaker = None
-                            current_text = []
-                            
-                            for word_info in alternative['words']:
-                                speaker_label = word_info.get('speakerLabel', word_info.get('speakerTag', 'Unknown'))
-                                word = word_info.get('word', '')
-                                
-                                if speaker_label != current_speaker:
-                                    # Save previous segment
-                                    if current_speaker is not None:
-                                        transcription_segments.append({
-                                            'speaker': current_speaker,
-                                            'text': ' '.join(current_text)
-                                        })
-                                    
-                                    # Start new segment
-                                    current_speaker = speaker_label
-                                    current_text = [word]
-                                else:
-                                    current_text.append(word)
-                            
-                            # Add the last segment
-                            if current_speaker is not None:
-                                transcription_segments.append({
-                                    'speaker': current_speaker,
-                                    'text': ' '.join(current_text)
-                                })
+    deadline = time.monotonic() + 3 * MAX_AUDIO_LENGTH_SECS
+    interval = SHARD_POLL_INTERVAL
+    
+    # Download and parse shards concurrently as they are listed
+    shard_futures = {}
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_WORKERS) as pool:
+        while True:
+            # Checked before listing so the last pass sees every shard
+            done = operation is None or operation.done()
+            for blob in bucket.list_blobs(prefix=prefix):
+                if blob.name.endswith('.json') and blob.name not in shard_futures:
+                    shard_futures[blob.name] = pool.submit(_shard_segments, blob)
+            if done:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Batch recognition did not finish in time")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, SHARD_POLL_MAX_INTERVAL)
+        
+        if operation is not None:
+            # Raises if recognition failed
+            operation.result()
+        
+        transcription_segments = []
+        for name in sorted(shard_futures):
+            transcription_segments.extend(shard_futures[name].result())
     
     # Format output
     if not transcription_segments:
         return "No transcription results found."
     
-    output = "=" * 80 + "\n"
-    output += "TRANSCRIPTION WITH SPEAKER DIARIZATION (Chirp 3 Model)\n"
-    output += "=" * 80 + "\n\n"
+    # Collected and joined once; += would copy the whole output each time
+    parts = [
+        "=" * 80 + "\n",
+        "TRANSCRIPTION WITH SPEAKER DIARIZATION (Chirp 3 Model)\n",
+        "=" * 80 + "\n\n"
+    ]
     
     for segment in transcription_segments:
-        output += f"Speaker {segment['speaker']}:\n"
-        output += f"{segment['text']}\n\n"
+        parts.append(f"Speaker {segment['speaker']}:\n{segment['text']}\n\n")
     
-    return output
+    return "".join(parts)
 
 
 def main():
     """Main function to run the transcription script."""
     
+    args = sys.argv[1:]
+    parallel_upload = '--parallel-upload' in args
+    args = [arg for arg in args if arg != '--parallel-upload']
+
     # Check if audio file path is provided
-    if len(sys.argv) < 2:
-        print("Usage: python transcribe_audio.py <path_to_audio_file.mp3>")
+    if not args:
+        print("Usage: python transcribe_audio.py <path_to_audio_file.mp3> [--parallel-upload]")
+        print("\nOptions:")
+        print("  --parallel-upload - Upload files over 64 MB as concurrent parts")
+        print("                      (UPLOAD_MAX_WORKERS at a time, default 8)")
         print("\nRequired environment variables:")
         print("  GCS_BUCKET_NAME - Your Google Cloud Storage bucket name")
         print("  GOOGLE_PROJECT_ID - Your Google Cloud project ID")
@@ -222,7 +387,7 @@ def main():
         print("  Run 'gcloud auth application-default login' to authenticate")
         sys.exit(1)
     
-    audio_file_path = sys.argv[1]
+    audio_file_path = args[0]
     
     # Check if file exists
     if not os.path.exists(audio_file_path):
@@ -231,7 +396,7 @@ def main():
     
     # Check authentication for Cloud Storage and Speech API
     try:
-        credentials, _ = default()
+        _credentials()
         print("✓ Authentication found")
     except Exception as e:
         print("\nError: Google Cloud authentication not found.")
@@ -260,39 +425,50 @@ def main():
     
     try:
         # Generate unique blob names
-        import time
         timestamp = int(time.time())
         audio_filename = os.path.basename(audio_file_path)
-        audio_blob_name = f"audio-files/{timestamp}_{audio_filename}"
+        # Large recordings go up as speech-tuned Opus: far fewer bytes to send
+        transcode = needs_opus_transcode(audio_file_path)
+        blob_filename = audio_filename.rsplit('.', 1)[0] + '.ogg' if transcode else audio_filename
+        # Named by content so re-runs on the same recording reuse the upload
+        audio_blob_name = f"audio-files/{hash_file(audio_file_path)}_{blob_filename}"
         output_folder_name = f"transcripts/{timestamp}_{audio_filename.rsplit('.', 1)[0]}"
         
         # Upload audio file to GCS
-        audio_gcs_uri = upload_to_gcs(audio_file_path, bucket_name, audio_blob_name)
+        audio_gcs_uri = upload_to_gcs(audio_file_path, bucket_name, audio_blob_name,
+                                      parallel=parallel_upload, skip_if_exists=True, transcode=transcode)
         gcs_output_folder = f"gs://{bucket_name}/{output_folder_name}"
         
         # Transcribe the audio
         print("\n" + "=" * 80)
-        response = transcribe_audio_with_diarization(
+        operation = transcribe_audio_with_diarization(
             audio_gcs_uri, 
             gcs_output_folder, 
             project_id
         )
         
-        print(f"\nBatch recognition completed!")
-        print(f"Results saved to: {gcs_output_folder}")
+        print("Waiting for operation to complete...")
         
-        # Download and format the transcription
+        # Download and format the transcription, fetching shards while it runs
         formatted_transcription = download_and_format_transcription(
             gcs_output_folder, 
-            bucket_name
+            bucket_name,
+            operation
         )
         
+        print(f"\nBatch recognition completed!")
+        print(f"Results saved to: {gcs_output_folder}")
+        
         print("\n" + formatted_transcription)
         
         # Save to local file
         output_file = audio_file_path.rsplit('.', 1)[0] + '_transcription.txt'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(formatted_transcription)
+        # Encode once, write bytes to a temp file and swap it in, so a partial
+        # transcript never replaces an existing one
+        tmp_file = output_file + '.tmp'
+        with open(tmp_file, 'wb', buffering=1024 * 1024) as f:
+            f.write(formatted_transcription.encode('utf-8'))
+        os.replace(tmp_file, output_file)
         
         print(f"Transcription saved locally to: {output_file}")
         print("=" * 80 + "\n")